@@ -1,18 +1,42 @@
-from flask import Flask, render_template, jsonify, url_for, redirect, request, flash
+from flask import Flask, render_template, jsonify, url_for, redirect, request, flash, session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_bcrypt import Bcrypt
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.middleware.proxy_fix import ProxyFix
 from functools import wraps
+import click
 from datetime import datetime
+import re
+from sqlalchemy import select, func, event, inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload, joinedload, raiseload, load_only, undefer, undefer_group, object_session
 
 from db import db  
-from models import Usuario, Cliente, Servicio, Proveedor, Evento, EventoServicio
+from cache import cache
+from models import Usuario, Cliente, Servicio, Proveedor, Evento, EventoServicio, ROL_CLIENTE
 from forms import LoginForm, RegistroForm, EventoForm, ServicioForm, ProveedorForm, AgregarServicioEventoForm
 
 app = Flask(__name__)
 app.config.from_object('config')
+# En Render la app corre detrás de un proxy: sin esto request.remote_addr es la IP
+# del proxy y todos los visitantes comparten el mismo límite de Flask-Limiter
+if app.config['PROXY_SALTOS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_SALTOS'])
 db.init_app(app)
+cache.init_app(app)
+
+# Bytecode de plantillas en disco: los workers nuevos no recompilan cada plantilla.
+# Jinja compara el checksum del fuente, así que una plantilla editada se recompila igual
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
 
 bcrypt = Bcrypt(app)
+# Filtro rápido de formato para /api/verificar-email, compilado una sola vez
+PATRON_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+# Hash de referencia para verificar contraseñas de usuarios inexistentes (ver login)
+HASH_FICTICIO = bcrypt.generate_password_hash('x' * 12).decode('utf-8')
+limiter = Limiter(get_remote_address, app=app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'  
 login_manager.login_message = 'Por favor inicia sesión para acceder a esta página.'
@@ -21,7 +45,7 @@ login_manager.login_message_category = 'warning'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return Usuario.query.get(int(user_id))
+    return db.session.get(Usuario, int(user_id))
 
 def admin_required(f):
     @wraps(f)
@@ -36,6 +60,87 @@ def admin_required(f):
     return decorated_function
 
 
+def opciones_listado(*opciones):
+    """
+    Opciones de carga para los listados. Si SQLALCHEMY_RAISELOAD está activo
+    se agrega raiseload('*') para que cualquier relación no cargada de antemano
+    lance un error en vez de disparar un SELECT por fila.
+    """
+    if app.config.get('SQLALCHEMY_RAISELOAD'):
+        return (*opciones, raiseload('*'))
+    return opciones
+
+
+@cache.memoize(60)
+def get_servicios_disponibles():
+    """Catálogo de servicios disponibles. Se invalida cuando un administrador modifica servicios"""
+    # El catálogo muestra descripción e imagen: se cargan completos porque el caché
+    # guarda objetos desconectados de la sesión que ya no pueden cargar columnas
+    return Servicio.query.options(undefer_group('detalles')).filter_by(disponible=True).all()
+
+
+@cache.memoize(60)
+def get_admin_counters():
+    """Contadores del panel de administración. Se invalida al crear usuarios, eventos o servicios"""
+    # Un solo SELECT con subconsultas escalares: un viaje a la base en lugar de cuatro
+    fila = db.session.execute(select(
+        select(func.count()).select_from(Usuario).scalar_subquery().label('total_usuarios'),
+        select(func.count()).select_from(Evento).scalar_subquery().label('total_eventos'),
+        select(func.count()).select_from(Servicio).scalar_subquery().label('total_servicios'),
+        select(func.count()).select_from(Evento).filter_by(estado='pendiente').scalar_subquery().label('eventos_pendientes'),
+    )).one()
+    return dict(fila._mapping)
+
+
+@cache.memoize(30)
+def username_registrado(username):
+    """Consulta de existencia (SELECT EXISTS ...) para la validación AJAX del registro"""
+    return db.session.execute(select(db.exists().where(Usuario.username == username))).scalar()
+
+
+@cache.memoize(30)
+def email_registrado(email):
+    """Consulta de existencia (SELECT EXISTS ...) para la validación AJAX del registro"""
+    return db.session.execute(select(db.exists().where(Usuario.email == email))).scalar()
+
+
+def invalidar_cache_servicios():
+    cache.delete_memoized(get_servicios_disponibles)
+    cache.delete_memoized(get_admin_counters)
+
+
+def leer_fecha_evento(texto):
+    """
+    Convierte el valor del input datetime-local (YYYY-MM-DDTHH:MM) a datetime.
+    fromisoformat acepta más formatos (solo fecha, zona horaria, semanas ISO),
+    así que se exige que el resultado vuelva a dar exactamente el mismo texto.
+    """
+    fecha = datetime.fromisoformat(texto)
+    if fecha.tzinfo is not None or fecha.isoformat(timespec='minutes') != texto:
+        raise ValueError(f'Formato de fecha inválido: {texto!r}')
+    return fecha
+
+
+# Cualquier INSERT/UPDATE/DELETE de Servicio marca la sesión; el caché del catálogo
+# se invalida hasta que el commit se confirma, para no recargarlo con datos sin confirmar
+@event.listens_for(Servicio, 'after_insert')
+@event.listens_for(Servicio, 'after_update')
+@event.listens_for(Servicio, 'after_delete')
+def marcar_catalogo_modificado(mapper, connection, target):
+    object_session(target).info['catalogo_modificado'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidar_catalogo_modificado(session):
+    if session.info.pop('catalogo_modificado', False):
+        invalidar_cache_servicios()
+
+
+@event.listens_for(Session, 'after_rollback')
+def descartar_catalogo_modificado(session):
+    session.info.pop('catalogo_modificado', None)
+
+
 # RUTAS PÚBLICAS
 
 @app.route('/')
@@ -46,7 +151,7 @@ def index():
 
 @app.route('/servicios')
 def servicios():
-    servicios_lista = Servicio.query.filter_by(disponible=True).all()
+    servicios_lista = get_servicios_disponibles()
     return render_template('servicios.htm', servicios=servicios_lista)
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -61,7 +166,14 @@ def login():
     if form.validate_on_submit():
         usuario = Usuario.query.filter_by(username=form.username.data).first()
         
-        if usuario and bcrypt.check_password_hash(usuario.password_hash, form.password.data):
+        # Siempre se ejecuta bcrypt, exista o no el usuario, para que el tiempo
+        # de respuesta no revele qué nombres de usuario están registrados
+        password_valida = bcrypt.check_password_hash(
+            usuario.password_hash if usuario else HASH_FICTICIO,
+            form.password.data
+        )
+        
+        if usuario and password_valida:
             if not usuario.activo:
                 flash('Tu cuenta está desactivada. Contacta al administrador.', 'danger')
                 return redirect(url_for('login'))
@@ -99,11 +211,14 @@ def registro():
             email=form.email.data,
             telefono=form.telefono.data,
             password_hash=password_hash,
-            rol='cliente'  
+            rol=ROL_CLIENTE
         )
         
         db.session.add(nuevo_usuario)
         db.session.commit()
+        cache.delete_memoized(get_admin_counters)
+        cache.delete_memoized(username_registrado, form.username.data)
+        cache.delete_memoized(email_registrado, form.email.data)
         
         flash('¡Cuenta creada exitosamente! Ya puedes iniciar sesión.', 'success')
         return redirect(url_for('login'))
@@ -126,7 +241,15 @@ def cliente_dashboard():
     if current_user.es_admin():
         return redirect(url_for('admin_dashboard'))
     
-    eventos = Evento.query.filter_by(usuario_id=current_user.id).order_by(Evento.fecha_evento.desc()).all()
+    eventos = db.session.execute(
+        select(Evento)
+        .options(*opciones_listado(
+            undefer(Evento.total),
+            selectinload(Evento.servicios_contratados).load_only(EventoServicio.id)
+        ))
+        .filter_by(usuario_id=current_user.id)
+        .order_by(Evento.fecha_evento.desc())
+    ).scalars().all()
     return render_template('cliente/dashboard.htm', eventos=eventos)
 
 
@@ -137,7 +260,7 @@ def cliente_nuevo_evento():
     
     if form.validate_on_submit():
         try:
-            fecha_evento = datetime.strptime(form.fecha_evento.data, '%Y-%m-%dT%H:%M')
+            fecha_evento = leer_fecha_evento(form.fecha_evento.data)
         except ValueError:
             flash('Formato de fecha inválido.', 'danger')
             return render_template('cliente/evento_form.htm', form=form)
@@ -155,6 +278,7 @@ def cliente_nuevo_evento():
         
         db.session.add(nuevo_evento)
         db.session.commit()
+        cache.delete_memoized(get_admin_counters)
         
         flash('¡Evento creado exitosamente!', 'success')
         return redirect(url_for('cliente_ver_evento', evento_id=nuevo_evento.id))
@@ -166,13 +290,20 @@ def cliente_nuevo_evento():
 @login_required
 def cliente_ver_evento(evento_id):
  
-    evento = Evento.query.get_or_404(evento_id)
+    evento = db.first_or_404(
+        select(Evento)
+        .options(
+            undefer(Evento.total),
+            selectinload(Evento.servicios_contratados).joinedload(EventoServicio.servicio)
+        )
+        .filter_by(id=evento_id)
+    )
     
     if evento.usuario_id != current_user.id and not current_user.es_admin():
         flash('No tienes permiso para ver este evento.', 'danger')
         return redirect(url_for('cliente_dashboard'))
     
-    servicios_disponibles = Servicio.query.filter_by(disponible=True).all()
+    servicios_disponibles = get_servicios_disponibles()
     return render_template('cliente/evento_detalle.htm', evento=evento, servicios_disponibles=servicios_disponibles)
 
 
@@ -189,11 +320,11 @@ def cliente_editar_evento(evento_id):
     form = EventoForm(obj=evento)
     
     if request.method == 'GET':
-        form.fecha_evento.data = evento.fecha_evento.strftime('%Y-%m-%dT%H:%M')
+        form.fecha_evento.data = evento.fecha_evento.isoformat(timespec='minutes')
     
     if form.validate_on_submit():
         try:
-            fecha_evento = datetime.strptime(form.fecha_evento.data, '%Y-%m-%dT%H:%M')
+            fecha_evento = leer_fecha_evento(form.fecha_evento.data)
         except ValueError:
             flash('Formato de fecha inválido.', 'danger')
             return render_template('cliente/evento_form.htm', form=form, accion='Editar')
@@ -209,6 +340,7 @@ def cliente_editar_evento(evento_id):
             evento.estado = form.estado.data
         
         db.session.commit()
+        cache.delete_memoized(get_admin_counters)
         flash('Evento actualizado exitosamente.', 'success')
         return redirect(url_for('cliente_ver_evento', evento_id=evento.id))
     
@@ -227,6 +359,7 @@ def cliente_cancelar_evento(evento_id):
     
     evento.estado = 'cancelado'
     db.session.commit()
+    cache.delete_memoized(get_admin_counters)
     
     flash('Evento cancelado exitosamente.', 'info')
     return redirect(url_for('cliente_dashboard'))
@@ -251,20 +384,18 @@ def cliente_agregar_servicio(evento_id):
     
     servicio = Servicio.query.get_or_404(servicio_id)
     
-    existe = EventoServicio.query.filter_by(evento_id=evento_id, servicio_id=servicio_id).first()
-    if existe:
-        flash('Este servicio ya está agregado al evento.', 'warning')
-        return redirect(url_for('cliente_ver_evento', evento_id=evento_id))
-    
-    evento_servicio = EventoServicio(
-        evento_id=evento_id,
-        servicio_id=servicio_id,
-        precio_acordado=precio_acordado
+    # ON CONFLICT sobre uq_evento_servicio: si ya estaba agregado no se inserta nada
+    resultado = db.session.execute(
+        insert(EventoServicio)
+        .values(evento_id=evento_id, servicio_id=servicio_id, precio_acordado=precio_acordado)
+        .on_conflict_do_nothing(index_elements=['evento_id', 'servicio_id'])
     )
-    
-    db.session.add(evento_servicio)
     db.session.commit()
     
+    if resultado.rowcount == 0:
+        flash('Este servicio ya está agregado al evento.', 'warning')
+        return redirect(url_for('cliente_ver_evento', evento_id=evento_id))
+    
     flash(f'Servicio "{servicio.nombre}" agregado exitosamente.', 'success')
     return redirect(url_for('cliente_ver_evento', evento_id=evento_id))
 
@@ -293,26 +424,57 @@ def cliente_eliminar_servicio(evento_id, servicio_id):
 @admin_required
 def admin_dashboard():
 
-    total_usuarios = Usuario.query.count()
-    total_eventos = Evento.query.count()
-    total_servicios = Servicio.query.count()
-    eventos_pendientes = Evento.query.filter_by(estado='pendiente').count()
+    contadores = get_admin_counters()
     
-    eventos_recientes = Evento.query.order_by(Evento.fecha_creacion.desc()).limit(5).all()
+    eventos_recientes = db.session.execute(
+        select(Evento)
+        .options(*opciones_listado(
+            joinedload(Evento.cliente).load_only(Usuario.nombre_completo),
+            selectinload(Evento.servicios_contratados).load_only(EventoServicio.id)
+        ))
+        .order_by(Evento.fecha_creacion.desc())
+        .limit(5)
+    ).scalars().all()
     
     return render_template('admin/dashboard.htm', 
-                         total_usuarios=total_usuarios,
-                         total_eventos=total_eventos,
-                         total_servicios=total_servicios,
-                         eventos_pendientes=eventos_pendientes,
-                         eventos_recientes=eventos_recientes)
+                         eventos_recientes=eventos_recientes,
+                         **contadores)
 
 
 @app.route('/admin/servicios')
 @admin_required
 def admin_servicios():
-    servicios_lista = Servicio.query.all()
-    return render_template('admin/servicios.htm', servicios=servicios_lista)
+    # Los filtros se aplican en la consulta para que abarquen todas las páginas;
+    # solo se conservan los que traen valor para repetirlos en los enlaces
+    filtros = {
+        clave: valor for clave, valor in (
+            ('q', request.args.get('q', '').strip()),
+            ('categoria', request.args.get('categoria', '')),
+            ('disponible', request.args.get('disponible', ''))
+        ) if valor
+    }
+    
+    consulta = select(Servicio).options(*opciones_listado(
+        load_only(Servicio.id, Servicio.nombre, Servicio.descripcion, Servicio.categoria,
+                  Servicio.precio_base, Servicio.disponible, Servicio.fecha_creacion)
+    ))
+    if 'q' in filtros:
+        consulta = consulta.where(Servicio.nombre.ilike(f"%{filtros['q']}%"))
+    if 'categoria' in filtros:
+        consulta = consulta.where(Servicio.categoria == filtros['categoria'])
+    if filtros.get('disponible') == 'disponible':
+        consulta = consulta.where(Servicio.disponible == True)
+    elif filtros.get('disponible') == 'no-disponible':
+        consulta = consulta.where(Servicio.disponible == False)
+    
+    pagination = db.paginate(
+        consulta.order_by(Servicio.id),
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['ELEMENTOS_POR_PAGINA'],
+        error_out=False
+    )
+    return render_template('admin/servicios.htm', servicios=pagination.items, pagination=pagination,
+                           filtros=filtros)
 
 
 @app.route('/admin/servicio/nuevo', methods=['GET', 'POST'])
@@ -342,7 +504,7 @@ def admin_nuevo_servicio():
 @app.route('/admin/servicio/<int:servicio_id>/editar', methods=['GET', 'POST'])
 @admin_required
 def admin_editar_servicio(servicio_id):
-    servicio = Servicio.query.get_or_404(servicio_id)
+    servicio = Servicio.query.options(undefer_group('detalles')).get_or_404(servicio_id)
     form = ServicioForm(obj=servicio)
     
     if form.validate_on_submit():
@@ -381,22 +543,52 @@ def admin_eliminar_servicio(servicio_id):
 @app.route('/admin/eventos')
 @admin_required
 def admin_eventos():
-    eventos = Evento.query.order_by(Evento.fecha_evento.desc()).all()
-    return render_template('admin/eventos.htm', eventos=eventos)
+    pagination = db.paginate(
+        select(Evento)
+        .options(*opciones_listado(
+            load_only(Evento.id, Evento.titulo, Evento.fecha_evento, Evento.lugar, Evento.estado),
+            undefer(Evento.total),
+            joinedload(Evento.cliente).load_only(Usuario.nombre_completo),
+            selectinload(Evento.servicios_contratados).load_only(EventoServicio.id)
+        ))
+        .order_by(Evento.fecha_evento.desc(), Evento.id.desc()),
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['ELEMENTOS_POR_PAGINA'],
+        error_out=False
+    )
+    return render_template('admin/eventos.htm', eventos=pagination.items, pagination=pagination)
 
 
 @app.route('/admin/evento/<int:evento_id>')
 @admin_required
 def admin_ver_evento(evento_id):
-    evento = Evento.query.get_or_404(evento_id)
+    evento = db.first_or_404(
+        select(Evento)
+        .options(
+            undefer(Evento.total),
+            joinedload(Evento.cliente),
+            selectinload(Evento.servicios_contratados).joinedload(EventoServicio.servicio)
+        )
+        .filter_by(id=evento_id)
+    )
     return render_template('admin/evento_detalle.htm', evento=evento)
 
 
 @app.route('/admin/usuarios')
 @admin_required
 def admin_usuarios():
-    usuarios = Usuario.query.all()
-    return render_template('admin/usuarios.htm', usuarios=usuarios)
+    pagination = db.paginate(
+        select(Usuario).options(*opciones_listado(
+            load_only(Usuario.id, Usuario.username, Usuario.nombre_completo, Usuario.email,
+                      Usuario.rol, Usuario.fecha_registro, Usuario.activo),
+            selectinload(Usuario.eventos).load_only(Evento.id)
+        ))
+        .order_by(Usuario.id),
+        page=request.args.get('page', 1, type=int),
+        per_page=app.config['ELEMENTOS_POR_PAGINA'],
+        error_out=False
+    )
+    return render_template('admin/usuarios.htm', usuarios=pagination.items, pagination=pagination)
 
 
 @app.route('/admin/usuario/<int:usuario_id>/toggle-activo', methods=['POST'])
@@ -420,7 +612,12 @@ def admin_toggle_usuario_activo(usuario_id):
 @app.route('/admin/proveedores')
 @admin_required
 def admin_proveedores():
-    proveedores = Proveedor.query.all()
+    proveedores = db.session.execute(
+        select(Proveedor).options(*opciones_listado(
+            load_only(Proveedor.id, Proveedor.nombre, Proveedor.tipo_servicio, Proveedor.contacto,
+                      Proveedor.telefono, Proveedor.email, Proveedor.calificacion, Proveedor.activo)
+        ))
+    ).scalars().all()
     return render_template('admin/proveedores.htm', proveedores=proveedores)
 
 
@@ -454,7 +651,7 @@ def admin_nuevo_proveedor():
 @admin_required
 def admin_editar_proveedor(proveedor_id):
     """Editar un proveedor existente"""
-    proveedor = Proveedor.query.get_or_404(proveedor_id)
+    proveedor = Proveedor.query.options(undefer(Proveedor.notas)).get_or_404(proveedor_id)
     form = ProveedorForm(obj=proveedor)
     
     if form.validate_on_submit():
@@ -487,6 +684,88 @@ def admin_eliminar_proveedor(proveedor_id):
 
 
 
+def agregar_restriccion_evento_servicio(eliminar_duplicados=False):
+    """
+    Agrega uq_evento_servicio a una tabla evento_servicio que ya existía.
+    create_all() no modifica tablas existentes, y el ON CONFLICT de
+    cliente_agregar_servicio necesita esta restricción. Si hay pares
+    (evento_id, servicio_id) repetidos solo se eliminan con eliminar_duplicados,
+    conservando la fila más antigua de cada par e imprimiendo las que se borran.
+    """
+    restricciones = inspect(db.engine).get_unique_constraints('evento_servicio')
+    if any(r['name'] == 'uq_evento_servicio' for r in restricciones):
+        return False
+    
+    with db.engine.begin() as conexion:
+        duplicados = conexion.execute(db.text(
+            'SELECT a.id, a.evento_id, a.servicio_id, a.precio_acordado, a.notas '
+            'FROM evento_servicio a WHERE EXISTS ('
+            '  SELECT 1 FROM evento_servicio b'
+            '  WHERE b.evento_id = a.evento_id AND b.servicio_id = a.servicio_id AND b.id < a.id'
+            ') ORDER BY a.evento_id, a.servicio_id, a.id'
+        )).all()
+        
+        if duplicados:
+            for fila in duplicados:
+                print(f"  evento_servicio id={fila.id} evento_id={fila.evento_id} "
+                      f"servicio_id={fila.servicio_id} precio_acordado={fila.precio_acordado} "
+                      f"notas={fila.notas!r}")
+            if not eliminar_duplicados:
+                raise click.ClickException(
+                    f'{len(duplicados)} filas duplicadas en evento_servicio (listadas arriba) '
+                    'impiden agregar uq_evento_servicio. Revísalas y ejecuta '
+                    'flask --app app init-db --eliminar-duplicados'
+                )
+            conexion.execute(
+                db.text('DELETE FROM evento_servicio WHERE id IN :ids')
+                .bindparams(db.bindparam('ids', expanding=True)),
+                {'ids': [fila.id for fila in duplicados]}
+            )
+            print(f"{len(duplicados)} filas duplicadas eliminadas de evento_servicio.")
+        
+        conexion.execute(db.text(
+            'ALTER TABLE evento_servicio '
+            'ADD CONSTRAINT uq_evento_servicio UNIQUE (evento_id, servicio_id)'
+        ))
+    return True
+
+
+def crear_indices_faltantes():
+    """
+    Crea los índices declarados en los modelos que no existan todavía en una
+    base creada antes de agregarlos. Devuelve los nombres de los índices creados.
+    """
+    with db.engine.begin() as conexion:
+        # ix_servicio_nombre_trgm usa el operador gin_trgm_ops de esta extensión
+        conexion.execute(db.text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    
+    creados = []
+    inspector = inspect(db.engine)
+    for tabla in db.metadata.sorted_tables:
+        nombres = {i['name'] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in nombres:
+                indice.create(db.engine)
+                creados.append(indice.name)
+    return creados
+
+
+@app.cli.command('init-db')
+@click.option('--eliminar-duplicados', is_flag=True,
+              help='Borra las filas repetidas de evento_servicio antes de agregar uq_evento_servicio.')
+def init_db(eliminar_duplicados):
+    """Crea las tablas que falten. Se ejecuta en cada despliegue: flask --app app init-db"""
+    db.create_all()
+    print("Tablas creadas exitosamente.")
+    
+    # Cambios de esquema sobre tablas que ya existían (solo PostgreSQL, idempotente)
+    if db.engine.dialect.name == 'postgresql':
+        if agregar_restriccion_evento_servicio(eliminar_duplicados):
+            print("Restricción uq_evento_servicio agregada.")
+        for nombre in crear_indices_faltantes():
+            print(f"Índice {nombre} creado.")
+
+
 @app.route('/test-db')
 def test_db():
     try:
@@ -517,11 +796,44 @@ def forbidden(e):
     return render_template('403.htm', error=str(e)), 403
 
 
+@app.errorhandler(429)
+def too_many_requests(e):
+    # Solo los endpoints AJAX de verificación tienen límite, responden JSON
+    return jsonify({'disponible': False, 'mensaje': 'Demasiadas solicitudes, intenta de nuevo en un momento.'}), 429
+
+
 @app.errorhandler(500)
 def internal_server_error(e):
     return render_template('500.htm', error=str(e)), 500
 
 
+# Páginas públicas que solo cambian cuando un administrador edita el catálogo
+PAGINAS_CACHEABLES = {'index', 'servicios'}
+
+
+@app.after_request
+def cache_paginas_publicas(response):
+    """
+    Agrega Cache-Control y ETag a las páginas públicas y a la búsqueda de servicios.
+    Las páginas HTML solo se marcan como públicas para visitantes anónimos y si no
+    mostraron mensajes flash (la sesión no cambió), porque el menú y los mensajes
+    dependen del usuario. Con If-None-Match igual al ETag se responde 304 sin cuerpo.
+    """
+    if request.method != 'GET' or response.status_code != 200:
+        return response
+    
+    if request.endpoint == 'buscar_servicios' or (
+        request.endpoint in PAGINAS_CACHEABLES
+        and not current_user.is_authenticated
+        and not session.modified
+    ):
+        response.cache_control.public = True
+        response.cache_control.max_age = 60
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
 @app.template_filter('currency')
 def currency_filter(value):
     if value is None:
@@ -545,6 +857,7 @@ def utility_processor():
 
 
 @app.route('/api/verificar-username', methods=["POST"])
+@limiter.limit(app.config['RATELIMIT_VERIFICACION'])
 def verificar_username():
     "Endpoint AJAX para verificar si user esta disponible. Retorna JSON"
     
@@ -558,9 +871,7 @@ def verificar_username():
         return jsonify({'disponible': False, 'mensaje': 'Minimo 3 caracteres'})
     
     #Buscar en DB
-    usuario_existente = Usuario.query.filter_by(username=username).first()
-    
-    if usuario_existente:
+    if username_registrado(username):
         return jsonify({'disponible': False, 'mensaje': 'El username ya esta en uso'})
     else:
         return jsonify({'disponible': True, 'mensaje': 'Username disponible'})
@@ -573,8 +884,15 @@ def buscar_servicios():
     if len(query) < 2:
         return jsonify({'servicios':[]})
     
-    #Buscar servicios con el query
-    servicios = Servicio.query.filter(
+    #Buscar servicios con el query (solo las columnas que se devuelven, sin construir objetos)
+    servicios = db.session.query(
+        Servicio.id,
+        Servicio.nombre,
+        Servicio.descripcion,
+        Servicio.precio_base,
+        Servicio.categoria,
+        Servicio.imagen_url
+    ).filter(
         Servicio.nombre.ilike(f'%{query}%'),
         Servicio.disponible == True
     ).limit(10).all()
@@ -595,6 +913,7 @@ def buscar_servicios():
     return jsonify({'servicios': resultados})
 
 @app.route('/api/verificar-email', methods=["POST"])
+@limiter.limit(app.config['RATELIMIT_VERIFICACION'])
 def verificar_email():
     "Endpoint AJAX para verificar si email esta disponible"
     
@@ -605,14 +924,11 @@ def verificar_email():
         return jsonify({'disponible': False, 'mensaje': 'El email no puede estar vacío.'})
     
     #Validacion basica de formato
-    import re
-    if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+    if not PATRON_EMAIL.match(email):
         return jsonify({'disponible': False, 'mensaje': 'Formato de email inválido.'})
     
     #Buscar en DB
-    usuario_existente = Usuario.query.filter_by(email=email).first()
-    
-    if usuario_existente:
+    if email_registrado(email):
         return jsonify({'disponible': False, 'mensaje': 'El email ya está en uso'})
     else:
         return jsonify({'disponible': True, 'mensaje': 'Email disponible'})
@@ -1,5 +1,8 @@
+"Crea las tablas. Equivale a: flask --app app init-db"
+
 from app import db, app
 
-with app.app_context():
-    db.create_all()
-    print("Tablas creadas exitosamente.")
\ No newline at end of file
+if __name__ == '__main__':
+    with app.app_context():
+        db.create_all()
+        print("Tablas creadas exitosamente.")
\ No newline at end of file
@@ -1,9 +1,53 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, TextAreaField, DecimalField, IntegerField, SelectField, DateTimeField
-from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, NumberRange, Optional
+from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange, Optional
+from sqlalchemy import or_, select
+from db import db
 from models import Usuario
 from datetime import datetime
 
+# Opciones de los SelectField, definidas una sola vez como tuplas inmutables
+_ESTADO_CHOICES = (
+    ('pendiente', 'Pendiente'),
+    ('confirmado', 'Confirmado'),
+    ('cancelado', 'Cancelado'),
+    ('completado', 'Completado'),
+)
+
+_CATEGORIA_CHOICES = (
+    ('decoracion', 'Decoración'),
+    ('catering', 'Catering'),
+    ('fotografia', 'Fotografía'),
+    ('entretenimiento', 'Entretenimiento'),
+    ('coordinacion', 'Coordinación'),
+    ('reposteria', 'Repostería'),
+    ('otro', 'Otro'),
+)
+
+# Validadores que se repiten en varios formularios. No guardan estado por
+# formulario, así que una sola instancia se comparte entre todos los campos
+_OPCIONAL = Optional()
+_USUARIO_OBLIGATORIO = DataRequired(message='El nombre de usuario es obligatorio')
+_USUARIO_LONGITUD = Length(min=3, max=80, message='El usuario debe tener entre 3 y 80 caracteres')
+_PASSWORD_OBLIGATORIA = DataRequired(message='La contraseña es obligatoria')
+_EMAIL_VALIDO = Email(message='Ingresa un correo electrónico válido')
+_TELEFONO_LONGITUD = Length(min=10, max=15, message='El teléfono debe tener entre 10 y 15 caracteres')
+_DESCRIPCION_LONGITUD = Length(max=1000, message='La descripción no puede exceder 1000 caracteres')
+_NOMBRE_LONGITUD = Length(min=3, max=150, message='El nombre debe tener entre 3 y 150 caracteres')
+_PRECIO_POSITIVO = NumberRange(min=0.01, message='El precio debe ser mayor a cero')
+
+
+def campo_telefono(etiqueta='Teléfono'):
+    """Campo de teléfono opcional, común al registro y a los proveedores"""
+    return StringField(etiqueta, 
+        validators=[
+            _OPCIONAL,
+            _TELEFONO_LONGITUD
+        ],
+        render_kw={"placeholder": "10 dígitos"}
+    )
+
+
 class LoginForm(FlaskForm):
     """
     Formulario de inicio de sesión.
@@ -11,15 +55,15 @@ class LoginForm(FlaskForm):
     """
     username = StringField('Usuario', 
         validators=[
-            DataRequired(message='El nombre de usuario es obligatorio'),
-            Length(min=3, max=80, message='El usuario debe tener entre 3 y 80 caracteres')
+            _USUARIO_OBLIGATORIO,
+            _USUARIO_LONGITUD
         ],
         render_kw={"placeholder": "Ingresa tu usuario"}
     )
     
     password = PasswordField('Contraseña', 
         validators=[
-            DataRequired(message='La contraseña es obligatoria')
+            _PASSWORD_OBLIGATORIA
         ],
         render_kw={"placeholder": "Ingresa tu contraseña"}
     )
@@ -34,8 +78,8 @@ class RegistroForm(FlaskForm):
     """
     username = StringField('Nombre de Usuario', 
         validators=[
-            DataRequired(message='El nombre de usuario es obligatorio'),
-            Length(min=3, max=80, message='El usuario debe tener entre 3 y 80 caracteres')
+            _USUARIO_OBLIGATORIO,
+            _USUARIO_LONGITUD
         ],
         render_kw={"placeholder": "Elige un nombre de usuario"}
     )
@@ -43,7 +87,7 @@ class RegistroForm(FlaskForm):
     nombre_completo = StringField('Nombre Completo', 
         validators=[
             DataRequired(message='El nombre completo es obligatorio'),
-            Length(min=3, max=150, message='El nombre debe tener entre 3 y 150 caracteres')
+            _NOMBRE_LONGITUD
         ],
         render_kw={"placeholder": "Tu nombre completo"}
     )
@@ -51,22 +95,16 @@ class RegistroForm(FlaskForm):
     email = StringField('Correo Electrónico', 
         validators=[
             DataRequired(message='El correo electrónico es obligatorio'),
-            Email(message='Ingresa un correo electrónico válido')
+            _EMAIL_VALIDO
         ],
         render_kw={"placeholder": "tu@email.com"}
     )
     
-    telefono = StringField('Teléfono', 
-        validators=[
-            Optional(),
-            Length(min=10, max=15, message='El teléfono debe tener entre 10 y 15 caracteres')
-        ],
-        render_kw={"placeholder": "10 dígitos"}
-    )
+    telefono = campo_telefono()
     
     password = PasswordField('Contraseña', 
         validators=[
-            DataRequired(message='La contraseña es obligatoria'),
+            _PASSWORD_OBLIGATORIA,
             Length(min=6, message='La contraseña debe tener al menos 6 caracteres')
         ],
         render_kw={"placeholder": "Mínimo 6 caracteres"}
@@ -80,22 +118,40 @@ class RegistroForm(FlaskForm):
         render_kw={"placeholder": "Repite tu contraseña"}
     )
     
-    def validate_username(self, username):
-        """
-        Validación personalizada para verificar que el username no esté en uso.
-        Se ejecuta automáticamente cuando el formulario se valida.
-        """
-        usuario = Usuario.query.filter_by(username=username.data).first()
-        if usuario:
-            raise ValidationError('Este nombre de usuario ya está en uso. Por favor elige otro.')
-    
-    def validate_email(self, email):
+    def validate(self, extra_validators=None):
         """
-        Validación personalizada para verificar que el email no esté registrado.
+        Valida los campos y luego verifica que el username y el email no estén
+        en uso con una sola consulta a la base de datos.
+        Solo se revisan los campos que pasaron sus propias validaciones.
         """
-        usuario = Usuario.query.filter_by(email=email.data).first()
-        if usuario:
-            raise ValidationError('Este correo electrónico ya está registrado. ¿Ya tienes cuenta?')
+        valido = super().validate(extra_validators=extra_validators)
+        
+        revisar_username = not self.username.errors
+        revisar_email = not self.email.errors
+        
+        condiciones = []
+        if revisar_username:
+            condiciones.append(Usuario.username == self.username.data)
+        if revisar_email:
+            condiciones.append(Usuario.email == self.email.data)
+        if not condiciones:
+            return valido
+        
+        existentes = db.session.execute(
+            select(Usuario.username, Usuario.email).where(or_(*condiciones))
+        ).all()
+        
+        for username, email in existentes:
+            if revisar_username and username == self.username.data:
+                self.username.errors.append('Este nombre de usuario ya está en uso. Por favor elige otro.')
+                revisar_username = False
+                valido = False
+            if revisar_email and email == self.email.data:
+                self.email.errors.append('Este correo electrónico ya está registrado. ¿Ya tienes cuenta?')
+                revisar_email = False
+                valido = False
+        
+        return valido
 
 
 class EventoForm(FlaskForm):
@@ -113,8 +169,8 @@ class EventoForm(FlaskForm):
     
     descripcion = TextAreaField('Descripción', 
         validators=[
-            Optional(),
-            Length(max=1000, message='La descripción no puede exceder 1000 caracteres')
+            _OPCIONAL,
+            _DESCRIPCION_LONGITUD
         ],
         render_kw={
             "placeholder": "Describe tu evento: temática, colores, estilo...",
@@ -142,7 +198,7 @@ class EventoForm(FlaskForm):
     
     num_invitados = IntegerField('Número de Invitados', 
         validators=[
-            Optional(),
+            _OPCIONAL,
             NumberRange(min=1, max=10000, message='Ingresa un número válido de invitados')
         ],
         render_kw={"placeholder": "Cantidad estimada"}
@@ -150,7 +206,7 @@ class EventoForm(FlaskForm):
     
     presupuesto_estimado = DecimalField('Presupuesto Estimado', 
         validators=[
-            Optional(),
+            _OPCIONAL,
             NumberRange(min=0, message='El presupuesto debe ser un valor positivo')
         ],
         render_kw={
@@ -160,12 +216,7 @@ class EventoForm(FlaskForm):
     )
     
     estado = SelectField('Estado', 
-        choices=[
-            ('pendiente', 'Pendiente'),
-            ('confirmado', 'Confirmado'),
-            ('cancelado', 'Cancelado'),
-            ('completado', 'Completado')
-        ],
+        choices=_ESTADO_CHOICES,
         validators=[DataRequired()]
     )
 
@@ -184,8 +235,8 @@ class ServicioForm(FlaskForm):
     
     descripcion = TextAreaField('Descripción', 
         validators=[
-            Optional(),
-            Length(max=1000, message='La descripción no puede exceder 1000 caracteres')
+            _OPCIONAL,
+            _DESCRIPCION_LONGITUD
         ],
         render_kw={
             "placeholder": "Describe el servicio en detalle",
@@ -196,7 +247,7 @@ class ServicioForm(FlaskForm):
     precio_base = DecimalField('Precio Base', 
         validators=[
             DataRequired(message='El precio base es obligatorio'),
-            NumberRange(min=0.01, message='El precio debe ser mayor a cero')
+            _PRECIO_POSITIVO
         ],
         render_kw={
             "placeholder": "Precio en pesos",
@@ -205,21 +256,13 @@ class ServicioForm(FlaskForm):
     )
     
     categoria = SelectField('Categoría', 
-        choices=[
-            ('decoracion', 'Decoración'),
-            ('catering', 'Catering'),
-            ('fotografia', 'Fotografía'),
-            ('entretenimiento', 'Entretenimiento'),
-            ('coordinacion', 'Coordinación'),
-            ('reposteria', 'Repostería'),
-            ('otro', 'Otro')
-        ],
+        choices=_CATEGORIA_CHOICES,
         validators=[DataRequired(message='Selecciona una categoría')]
     )
     
     imagen_url = StringField('URL de Imagen', 
         validators=[
-            Optional(),
+            _OPCIONAL,
             Length(max=255, message='La URL no puede exceder 255 caracteres')
         ],
         render_kw={"placeholder": "https://ejemplo.com/imagen.jpg"}
@@ -236,14 +279,14 @@ class ProveedorForm(FlaskForm):
     nombre = StringField('Nombre del Proveedor', 
         validators=[
             DataRequired(message='El nombre del proveedor es obligatorio'),
-            Length(min=3, max=150, message='El nombre debe tener entre 3 y 150 caracteres')
+            _NOMBRE_LONGITUD
         ],
         render_kw={"placeholder": "Nombre de la empresa o persona"}
     )
     
     tipo_servicio = StringField('Tipo de Servicio', 
         validators=[
-            Optional(),
+            _OPCIONAL,
             Length(max=100, message='El tipo de servicio no puede exceder 100 caracteres')
         ],
         render_kw={"placeholder": "Ej: Fotógrafo, Florista, DJ"}
@@ -251,31 +294,25 @@ class ProveedorForm(FlaskForm):
     
     contacto = StringField('Nombre de Contacto', 
         validators=[
-            Optional(),
+            _OPCIONAL,
             Length(max=100, message='El nombre de contacto no puede exceder 100 caracteres')
         ],
         render_kw={"placeholder": "Persona de contacto"}
     )
     
-    telefono = StringField('Teléfono', 
-        validators=[
-            Optional(),
-            Length(min=10, max=15, message='El teléfono debe tener entre 10 y 15 caracteres')
-        ],
-        render_kw={"placeholder": "10 dígitos"}
-    )
+    telefono = campo_telefono()
     
     email = StringField('Correo Electrónico', 
         validators=[
-            Optional(),
-            Email(message='Ingresa un correo electrónico válido')
+            _OPCIONAL,
+            _EMAIL_VALIDO
         ],
         render_kw={"placeholder": "email@proveedor.com"}
     )
     
     calificacion = DecimalField('Calificación', 
         validators=[
-            Optional(),
+            _OPCIONAL,
             NumberRange(min=0, max=5, message='La calificación debe estar entre 0 y 5')
         ],
         render_kw={
@@ -286,7 +323,7 @@ class ProveedorForm(FlaskForm):
     
     notas = TextAreaField('Notas', 
         validators=[
-            Optional()
+            _OPCIONAL
         ],
         render_kw={
             "placeholder": "Información adicional sobre el proveedor",
@@ -310,7 +347,7 @@ class AgregarServicioEventoForm(FlaskForm):
     precio_acordado = DecimalField('Precio Acordado', 
         validators=[
             DataRequired(message='El precio acordado es obligatorio'),
-            NumberRange(min=0.01, message='El precio debe ser mayor a cero')
+            _PRECIO_POSITIVO
         ],
         render_kw={
             "placeholder": "Precio para este evento",
@@ -319,7 +356,7 @@ class AgregarServicioEventoForm(FlaskForm):
     )
     
     notas = TextAreaField('Notas', 
-        validators=[Optional()],
+        validators=[_OPCIONAL],
         render_kw={
             "placeholder": "Detalles específicos de este servicio para el evento",
             "rows": 2
@@ -0,0 +1,13 @@
+"Configuración de gunicorn. Se carga sola al ejecutar gunicorn desde la raíz del proyecto"
+
+import os
+
+# Workers síncronos con hilos: mientras un hilo espera a Postgres los demás atienden
+# otras peticiones, sin convertir las rutas a async
+worker_class = 'gthread'
+# Número fijo por defecto: en un contenedor cpu_count() reporta los núcleos del host,
+# no los de la instancia, y cada worker abre su propio pool de conexiones
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# Cada hilo usa a lo más una conexión, config.py ajusta DB_POOL_SIZE para que alcance
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
\ No newline at end of file
@@ -1,7 +1,13 @@
 from db import db
 from flask_login import UserMixin
+from sqlalchemy import select, func
+from sqlalchemy.orm import column_property, deferred
 from datetime import datetime
 
+# Valores posibles de Usuario.rol
+ROL_ADMIN = 'admin'
+ROL_CLIENTE = 'cliente'
+
 class Usuario(UserMixin, db.Model):
     """
     Modelo para autenticación y roles de usuario.
@@ -16,7 +22,7 @@ class Usuario(UserMixin, db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     
     # Rol: 'admin' o 'cliente'
-    rol = db.Column(db.String(20), nullable=False, default='cliente')
+    rol = db.Column(db.String(20), nullable=False, default=ROL_CLIENTE)
     
     # Información adicional
     nombre_completo = db.Column(db.String(150))
@@ -32,7 +38,7 @@ class Usuario(UserMixin, db.Model):
     
     def es_admin(self):
         """Método helper para verificar si el usuario es administrador"""
-        return self.rol == 'admin'
+        return self.rol == ROL_ADMIN
 
 
 class Servicio(db.Model):
@@ -41,14 +47,21 @@ class Servicio(db.Model):
     Los administradores pueden crear, editar y eliminar servicios.
     """
     __tablename__ = 'servicios'
+    __table_args__ = (
+        # Índice parcial: el catálogo público solo consulta servicios disponibles
+        db.Index('ix_servicio_disponible', 'disponible', postgresql_where=db.text('disponible')),
+        # Trigramas: permite usar índice en la búsqueda ILIKE '%texto%' de /api/buscar-servicios
+        db.Index('ix_servicio_nombre_trgm', 'nombre', postgresql_using='gin', postgresql_ops={'nombre': 'gin_trgm_ops'}),
+    )
     
     id = db.Column('id_servicios', db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
-    descripcion = db.Column(db.Text)
+    # Columnas pesadas diferidas (grupo 'detalles'): no se leen hasta que se usan
+    descripcion = deferred(db.Column(db.Text), group='detalles')
     precio_base = db.Column(db.Numeric(10, 2), nullable=False)
     categoria = db.Column(db.String(50))  # Ej: 'decoracion', 'catering', 'fotografia'
     disponible = db.Column(db.Boolean, default=True)
-    imagen_url = db.Column(db.String(255))
+    imagen_url = deferred(db.Column(db.String(255)), group='detalles')
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relación muchos a muchos con eventos
@@ -58,6 +71,14 @@ class Servicio(db.Model):
         return f'<Servicio {self.nombre}>'
 
 
+# El índice ix_servicio_nombre_trgm necesita la extensión pg_trgm
+db.event.listen(
+    Servicio.__table__,
+    'before_create',
+    db.DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
+
 class Proveedor(db.Model):
     """
     Proveedores externos que colaboran con Wedding Plan.
@@ -72,7 +93,7 @@ class Proveedor(db.Model):
     telefono = db.Column(db.String(15))
     email = db.Column(db.String(120))
     calificacion = db.Column(db.Numeric(3, 2))  # De 0.00 a 5.00
-    notas = db.Column(db.Text)
+    notas = deferred(db.Column(db.Text))  # Solo se muestra en el formulario de edición
     activo = db.Column(db.Boolean, default=True)
     
     def __repr__(self):
@@ -85,6 +106,10 @@ class Evento(db.Model):
     Contiene toda la información de la boda o celebración.
     """
     __tablename__ = 'eventos'
+    __table_args__ = (
+        # Dashboard del cliente: WHERE usuario_id = ? ORDER BY fecha_evento DESC
+        db.Index('ix_evento_usuario_fecha', 'usuario_id', 'fecha_evento'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -94,7 +119,7 @@ class Evento(db.Model):
     # Información del evento
     titulo = db.Column(db.String(200), nullable=False)
     descripcion = db.Column(db.Text)
-    fecha_evento = db.Column(db.DateTime, nullable=False)
+    fecha_evento = db.Column(db.DateTime, nullable=False, index=True)
     lugar = db.Column(db.String(255))
     num_invitados = db.Column(db.Integer)
     presupuesto_estimado = db.Column(db.Numeric(10, 2))
@@ -113,9 +138,12 @@ class Evento(db.Model):
         return f'<Evento {self.titulo} - {self.fecha_evento}>'
     
     def calcular_total(self):
-        """Calcula el costo total del evento sumando todos los servicios"""
-        total = sum(es.precio_acordado for es in self.servicios_contratados)
-        return total
+        """
+        Costo total del evento: suma de precio_acordado de sus servicios.
+        La suma la hace la base de datos (ver Evento.total); las consultas de
+        listados usan undefer(Evento.total) para traerla en el mismo SELECT.
+        """
+        return self.total
 
 
 class EventoServicio(db.Model):
@@ -124,6 +152,11 @@ class EventoServicio(db.Model):
     Permite que un evento tenga múltiples servicios y un servicio esté en múltiples eventos.
     """
     __tablename__ = 'evento_servicio'
+    __table_args__ = (
+        # Un servicio solo puede agregarse una vez a cada evento
+        db.UniqueConstraint('evento_id', 'servicio_id', name='uq_evento_servicio'),
+        db.Index('ix_es_servicio', 'servicio_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     evento_id = db.Column(db.Integer, db.ForeignKey('eventos.id'), nullable=False)
@@ -138,6 +171,17 @@ class EventoServicio(db.Model):
         return f'<EventoServicio {self.evento_id}-{self.servicio_id}>'
 
 
+# Total del evento calculado en SQL con una subconsulta correlacionada.
+# Es diferido: solo se incluye en el SELECT cuando la consulta pide undefer(Evento.total)
+Evento.total = column_property(
+    select(func.coalesce(func.sum(EventoServicio.precio_acordado), 0))
+    .where(EventoServicio.evento_id == Evento.id)
+    .correlate_except(EventoServicio)
+    .scalar_subquery(),
+    deferred=True
+)
+
+
 # Modelo Cliente original (lo mantenemos por compatibilidad)
 class Cliente(db.Model):
     """
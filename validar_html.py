@@ -1,6 +1,7 @@
 "Script para generar HTML renderizado de todas las páginas para validación W3C"
 
-from app import app
+from app import app, db
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 
 PAGINAS = [
@@ -10,6 +11,22 @@ PAGINAS = [
     ('/registro', 'registro.html'),
 ]
 
+def generar_pagina(ruta, nombre_archivo, output_dir):
+    "Renderiza una página con su propio cliente de pruebas y la guarda en disco"
+    
+    # Cada hilo usa su cliente; la sesión de SQLAlchemy se cierra al terminar cada petición
+    with app.test_client() as client:
+        response = client.get(ruta)
+    
+    if response.status_code != 200:
+        return f'✗ Error en {ruta}: {response.status_code}'
+    
+    filepath = os.path.join(output_dir, nombre_archivo)
+    # El cuerpo ya viene codificado en UTF-8: se escribe tal cual
+    with open(filepath, 'wb') as f:
+        f.write(response.get_data())
+    return f'✓ {nombre_archivo} guardado'
+
 def generar_html_estatico():
     "Genera archivos HTML estáticos para validación"
     
@@ -17,19 +34,22 @@ def generar_html_estatico():
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    with app.test_client() as client:
+    # Se abren de antemano las conexiones que usarán los hilos; al cerrarlas
+    # quedan en el pool y ninguna petición paga el costo de conectarse
+    with app.app_context():
+        conexiones = [db.engine.connect() for _ in PAGINAS]
+        for conexion in conexiones:
+            conexion.close()
+    
+    # Las páginas se generan en paralelo, una por hilo
+    with ThreadPoolExecutor(max_workers=len(PAGINAS)) as executor:
+        futuros = []
         for ruta, nombre_archivo in PAGINAS:
             print(f'Generando {nombre_archivo}...')
-            
-            response = client.get(ruta)
-            
-            if response.status_code == 200:
-                filepath = os.path.join(output_dir, nombre_archivo)
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(response.data.decode('utf-8'))
-                print(f'✓ {nombre_archivo} guardado')
-            else:
-                print(f'✗ Error en {ruta}: {response.status_code}')
+            futuros.append(executor.submit(generar_pagina, ruta, nombre_archivo, output_dir))
+        
+        for futuro in as_completed(futuros):
+            print(futuro.result())
     
     print(f'\nArchivos guardados en carpeta: {output_dir}/')
     print('Sube estos archivos a https://validator.w3.org/ para validar')
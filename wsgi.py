@@ -0,0 +1,5 @@
+"Punto de entrada WSGI para producción: gunicorn wsgi:app (configuración en gunicorn.conf.py)"
+
+from app import app
+
+application = app